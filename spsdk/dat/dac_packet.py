@@ -7,7 +7,12 @@
 
 """Module with Debug Authentication Challenge (DAC) Packet."""
 
-from struct import calcsize, pack, unpack_from
+from struct import Struct
+
+_HEAD = Struct("<2HL16sL")
+# tail layout differs only in the length of the RoT key table hash
+_TAILS = {hash_length: Struct(f"<{hash_length}s3L32s") for hash_length in (32, 48)}
+_PACKETS = {hash_length: Struct(f"<2HL16sL{hash_length}s3L32s") for hash_length in (32, 48)}
 
 
 class DebugAuthenticationChallenge:
@@ -47,31 +52,44 @@ class DebugAuthenticationChallenge:
         self.cc_vu = cc_vu
         self.challenge = challenge
 
+    @property
+    def version(self) -> str:
+        """Version of the DAC packet."""
+        return f"{self._version_major}.{self._version_minor}"
+
+    @version.setter
+    def version(self, value: str) -> None:
+        """Set version of the DAC packet, e.g. '1.0' or '2.1'."""
+        self._version_major, self._version_minor = (int(part) for part in value.split("."))
+
     def info(self) -> str:
         """String representation of DebugCredential."""
-        msg = f"Version                : {self.version}\n"
-        msg += f"SOCC                   : {self.socc}\n"
-        msg += f"UUID                   : {self.uuid.hex().upper()}\n"
-        msg += f"CC_VU                  : {self.cc_vu}\n"
-        msg += f"ROTID_rkh_revocation   : {format(self.rotid_rkh_revocation, '08X')}\n"
-        msg += f"ROTID_rkth_hash        : {self.rotid_rkth_hash.hex()}\n"
-        msg += f"CC_soc_pinned          : {format(self.cc_soc_pinned, '08X')}\n"
-        msg += f"CC_soc_default         : {format(self.cc_soc_default, '08X')}\n"
-        msg += f"Challenge              : {self.challenge.hex()}\n"
-        return msg
+        return (
+            f"Version                : {self.version}\n"
+            f"SOCC                   : {self.socc}\n"
+            f"UUID                   : {self.uuid.hex().upper()}\n"
+            f"CC_VU                  : {self.cc_vu}\n"
+            f"ROTID_rkh_revocation   : {self.rotid_rkh_revocation:08X}\n"
+            f"ROTID_rkth_hash        : {self.rotid_rkth_hash.hex()}\n"
+            f"CC_soc_pinned          : {self.cc_soc_pinned:08X}\n"
+            f"CC_soc_default         : {self.cc_soc_default:08X}\n"
+            f"Challenge              : {self.challenge.hex()}\n"
+        )
 
     def export(self) -> bytes:
         """Exports the DebugAuthenticationChallenge into bytes."""
-        data = pack("<2H", *[int(part) for part in self.version.split(".")])
-        data += pack("<L", self.socc)
-        data += self.uuid
-        data += pack("<L", self.rotid_rkh_revocation)
-        data += self.rotid_rkth_hash
-        data += pack("<L", self.cc_soc_pinned)
-        data += pack("<L", self.cc_soc_default)
-        data += pack("<L", self.cc_vu)
-        data += self.challenge
-        return data
+        return _PACKETS[len(self.rotid_rkth_hash)].pack(
+            self._version_major,
+            self._version_minor,
+            self.socc,
+            self.uuid,
+            self.rotid_rkh_revocation,
+            self.rotid_rkth_hash,
+            self.cc_soc_pinned,
+            self.cc_soc_default,
+            self.cc_vu,
+            self.challenge,
+        )
 
     @classmethod
     def parse(cls, data: bytes, offset: int = 0) -> "DebugAuthenticationChallenge":
@@ -81,19 +99,18 @@ class DebugAuthenticationChallenge:
         :param offset: Offset within the input data
         :return: DebugAuthenticationChallenge object
         """
-        format_head = "<2HL16sL"
-        version_major, version_minor, socc, uuid, rotid_rkh_revocation = unpack_from(
-            format_head, data, offset
+        version_major, version_minor, socc, uuid, rotid_rkh_revocation = _HEAD.unpack_from(
+            data, offset
         )
         hash_length = 48 if (socc == 4 and version_minor == 1 and version_major == 2) else 32
-        format_tail = f"<{hash_length}s3L32s"
+        tail = _TAILS[hash_length]
         (
             rotid_rkth_hash,
             cc_soc_pinned,
             cc_soc_default,
             cc_vu,
             challenge,
-        ) = unpack_from(format_tail, data, offset + calcsize(format_head))
+        ) = tail.unpack_from(data, offset + _HEAD.size)
         return cls(
             version=f"{version_major}.{version_minor}",
             socc=socc,
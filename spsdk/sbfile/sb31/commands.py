@@ -150,6 +150,16 @@ class CmdLoadBase(BaseCmd):
     """Base class for commands loading data."""
 
     HAS_MEMORY_ID_BLOCK = True
+    CMD_TAGS = frozenset(
+        [
+            EnumCmdTag.LOAD,
+            EnumCmdTag.LOAD_CMAC,
+            EnumCmdTag.LOAD_HASH_LOCKING,
+            EnumCmdTag.LOAD_KEY_BLOB,
+            EnumCmdTag.PROGRAM_FUSES,
+            EnumCmdTag.PROGRAM_IFR,
+        ]
+    )
 
     def __init__(self, cmd_tag: int, address: int, data: bytes, memory_id: int = 0) -> None:
         """Constructor for command.
@@ -174,7 +184,7 @@ class CmdLoadBase(BaseCmd):
 
     def info(self) -> str:
         """Get info about the load command."""
-        msg = f"{EnumCmdTag.name(self.cmd_tag)}: "
+        msg = f"{EnumCmdTag.resolve_name(self.cmd_tag)}: "
         if self.HAS_MEMORY_ID_BLOCK:
             msg += f"Address=0x{self.address:08X}, Length={self.length}, Memory ID={self.memory_id}"
         else:
@@ -206,14 +216,7 @@ class CmdLoadBase(BaseCmd):
         :raises SPSDKError: Invalid cmd_tag was found
         """
         address, _, data, cmd_tag, memory_id = cls._extract_data(data, offset)
-        if cmd_tag not in [
-            EnumCmdTag.LOAD,
-            EnumCmdTag.LOAD_CMAC,
-            EnumCmdTag.LOAD_HASH_LOCKING,
-            EnumCmdTag.LOAD_KEY_BLOB,
-            EnumCmdTag.PROGRAM_FUSES,
-            EnumCmdTag.PROGRAM_IFR,
-        ]:
+        if cmd_tag not in cls.CMD_TAGS:
             raise SPSDKError(f"Invalid cmd_tag found: {cmd_tag}")
         if cls == CmdLoadBase:
             return cls(cmd_tag=cmd_tag, address=address, data=data, memory_id=memory_id)
@@ -6,6 +6,9 @@
 # SPDX-License-Identifier: BSD-3-Clause
 """File including constants."""
 
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple, cast
+
 from spsdk.utils.easy_enum import Enum
 
 
@@ -29,3 +32,27 @@ class EnumCmdTag(Enum):
     CONFIGURE_MEMORY = (0x0B, "CONFIGURE_MEMORY")
     FILL_MEMORY = (0x0C, "FILL_MEMORY")
     FW_VERSION_CHECK = (0x0D, "FW_VERSION_CHECK")
+
+    @staticmethod
+    def resolve_name(value: int) -> Optional[str]:
+        """Get name of command tag in constant time.
+
+        :param value: Command tag value.
+        :return: Name of the command tag, None if the tag is not supported.
+        """
+        return _CMD_BY_VALUE.get(value)
+
+    @staticmethod
+    def resolve_value(name: str) -> Optional[int]:
+        """Get value of command tag in constant time.
+
+        :param name: Command tag name (case sensitive).
+        :return: Value of the command tag, None if the tag is not supported.
+        """
+        return _CMD_BY_NAME.get(name)
+
+
+# Lookup tables built once, the generic easy_enum lookups iterate over all items
+_CMD_ITEMS = cast(Iterable[Tuple[str, int, str]], EnumCmdTag)
+_CMD_BY_VALUE: Mapping[int, str] = MappingProxyType({value: name for name, value, _ in _CMD_ITEMS})
+_CMD_BY_NAME: Mapping[str, int] = MappingProxyType({name: value for name, value, _ in _CMD_ITEMS})
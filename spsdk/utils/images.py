@@ -6,13 +6,14 @@
 # SPDX-License-Identifier: BSD-3-Clause
 """Module to keep additional utilities for binary images."""
 
+import bisect
 import logging
-import math
+import mmap
 import os
+import secrets
 import textwrap
-from typing import TYPE_CHECKING, Any, Dict, List
-
-import colorama
+import traceback
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from spsdk import SPSDK_DATA_FOLDER
 from spsdk.exceptions import SPSDKError, SPSDKOverlapError, SPSDKValueError
@@ -33,31 +34,62 @@ if TYPE_CHECKING:
     import bincopy
 
 BINARY_SCH_FILE = os.path.join(SPSDK_DATA_FOLDER, "image", "sch_binary.yml")
+ELF_MAGIC = b"\x7fELF"
 
 logger = logging.getLogger(__name__)
 
+# One period of the incrementing pattern, repeated to fill up blocks
+_INC_PATTERN = bytes(range(0x100))
+_SPECIAL_FILLS = {"zeros": b"\x00", "ones": b"\xff", "inc": _INC_PATTERN}
+
+
+def _fill_with_pattern(buffer: memoryview, pattern: bytes) -> None:
+    """Fill up the whole buffer with repeated pattern.
+
+    The pattern is written once and then the already filled part is copied
+    over the rest, doubling its length in each step.
+
+    :param buffer: Writable buffer to fill.
+    :param pattern: Pattern to repeat.
+    """
+    size = len(buffer)
+    filled = min(len(pattern), size)
+    buffer[:filled] = pattern[:filled]
+    while filled < size:
+        chunk = min(filled, size - filled)
+        buffer[filled : filled + chunk] = buffer[:chunk]
+        filled += chunk
+
 
 class ColorPicker:
     """Simple class to get each time when ask different color from list."""
 
-    COLORS = [
-        colorama.Fore.LIGHTBLACK_EX,
-        colorama.Fore.BLUE,
-        colorama.Fore.GREEN,
-        colorama.Fore.CYAN,
-        colorama.Fore.YELLOW,
-        colorama.Fore.MAGENTA,
-        colorama.Fore.WHITE,
-        colorama.Fore.LIGHTBLUE_EX,
-        colorama.Fore.LIGHTCYAN_EX,
-        colorama.Fore.LIGHTGREEN_EX,
-        colorama.Fore.LIGHTMAGENTA_EX,
-        colorama.Fore.LIGHTWHITE_EX,
-        colorama.Fore.LIGHTYELLOW_EX,
-    ]
+    # filled up by the first instance, colorama is needed just for drawing
+    COLORS: List[str] = []
 
     def __init__(self) -> None:
         """Constructor of ColorPicker."""
+        if not ColorPicker.COLORS:
+            # import colorama only if needed to save startup time
+            import colorama  # pylint: disable=import-outside-toplevel
+
+            ColorPicker.COLORS.extend(
+                [
+                    colorama.Fore.LIGHTBLACK_EX,
+                    colorama.Fore.BLUE,
+                    colorama.Fore.GREEN,
+                    colorama.Fore.CYAN,
+                    colorama.Fore.YELLOW,
+                    colorama.Fore.MAGENTA,
+                    colorama.Fore.WHITE,
+                    colorama.Fore.LIGHTBLUE_EX,
+                    colorama.Fore.LIGHTCYAN_EX,
+                    colorama.Fore.LIGHTGREEN_EX,
+                    colorama.Fore.LIGHTMAGENTA_EX,
+                    colorama.Fore.LIGHTWHITE_EX,
+                    colorama.Fore.LIGHTYELLOW_EX,
+                ]
+            )
         self.index = len(self.COLORS)
 
     def get_color(self, unwanted_color: str = None) -> str:
@@ -109,6 +141,12 @@ class BinaryPattern:
                 )
 
         self._pattern = pattern
+        # Period of the pattern used to fill up blocks, random pattern has none
+        self._fill: Optional[bytes] = (
+            _SPECIAL_FILLS.get(pattern)
+            if pattern in BinaryPattern.SPECIAL_PATTERNS
+            else value_to_bytes(pattern)
+        )
 
     def get_block(self, size: int) -> bytes:
         """Get block filled with pattern.
@@ -120,17 +158,35 @@ class BinaryPattern:
             return bytes(size)
 
         if self._pattern == "ones":
-            return bytes(b"\xff" * size)
+            return b"\xff" * size
 
         if self._pattern == "rand":
             return crypto_backend().random_bytes(size)
 
         if self._pattern == "inc":
-            return bytes((x & 0xFF for x in range(size)))
+            repeat, remainder = divmod(size, len(_INC_PATTERN))
+            return _INC_PATTERN * repeat + _INC_PATTERN[:remainder]
 
-        pattern = value_to_bytes(self._pattern)
-        block = bytes(pattern * int((size / len(pattern))))
-        return block[:size]
+        assert self._fill
+        return (self._fill * (size // len(self._fill) + 1))[:size]
+
+    def fill_into(self, buffer: memoryview) -> None:
+        """Fill up the buffer with pattern in place.
+
+        :param buffer: Writable buffer to fill, the whole buffer is overwritten.
+        """
+        if self._fill is None:
+            buffer[:] = self.get_block(len(buffer))
+            return
+        _fill_with_pattern(buffer, self._fill)
+
+    @property
+    def is_zero(self) -> bool:
+        """Check whether the pattern fills up blocks just with zeros.
+
+        :return: True if the pattern is all zeros.
+        """
+        return self._fill is not None and not any(self._fill)
 
     @property
     def pattern(self) -> str:
@@ -180,14 +236,17 @@ class BinaryImage:
         """
         self.name = name
         self.description = description
-        self.offset = offset
+        self._offset = offset
         self._size = size
-        self.binary = binary
+        self._binary = binary
+        self._cached_len: Optional[int] = None
+        self._cached_address: Optional[int] = None
         self.pattern = pattern
         self.parent = parent
         if parent:
             assert isinstance(parent, BinaryImage)
         self.sub_images: List["BinaryImage"] = []
+        self._wrap_cache: Dict[Tuple[str, int], List[str]] = {}
 
     def add_image(self, image: "BinaryImage") -> None:
         """Add new sub image information.
@@ -195,11 +254,81 @@ class BinaryImage:
         :param image: Image object.
         """
         image.parent = self
-        for i, child in enumerate(self.sub_images):
-            if image.offset < child.offset:
-                self.sub_images.insert(i, image)
-                return
-        self.sub_images.append(image)
+        image._invalidate_address()  # pylint: disable=protected-access
+        bisect.insort(self.sub_images, image)
+        self._invalidate_len()
+
+    @property
+    def offset(self) -> int:
+        """Image offset in parent image."""
+        return self._offset
+
+    @offset.setter
+    def offset(self, value: int) -> None:
+        """Set image offset in parent image, sub images of parent are kept sorted."""
+        index = self._sibling_index()
+        self._offset = value
+        self._invalidate_address()
+        if self.parent is not None:
+            siblings = self.parent.sub_images
+            if index is not None and (
+                (index > 0 and value < siblings[index - 1].offset)
+                or (index + 1 < len(siblings) and siblings[index + 1].offset < value)
+            ):
+                del siblings[index]
+                bisect.insort(siblings, self)
+            self.parent._invalidate_len()  # pylint: disable=protected-access
+
+    def _sibling_index(self) -> Optional[int]:
+        """Get index of this image in sub images of its parent.
+
+        :return: Index of image, None if the image is not added into its parent.
+        """
+        if self.parent is None:
+            return None
+        siblings = self.parent.sub_images
+        index = bisect.bisect_left(siblings, self)
+        while index < len(siblings) and siblings[index].offset == self.offset:
+            if siblings[index] is self:
+                return index
+            index += 1
+        return None
+
+    @property
+    def binary(self) -> Optional[bytes]:
+        """Optional binary content of image."""
+        return self._binary
+
+    @binary.setter
+    def binary(self, value: Optional[bytes]) -> None:
+        """Set binary content of image."""
+        self._binary = value
+        self._invalidate_len()
+
+    def _invalidate_len(self) -> None:
+        """Drop the cached size of this image and all its parents."""
+        image: Optional[BinaryImage] = self
+        while image is not None:
+            image._cached_len = None  # pylint: disable=protected-access
+            image = image.parent
+
+    def _invalidate_address(self) -> None:
+        """Drop the cached absolute address of this image and all its sub images."""
+        images = [self]
+        while images:
+            image = images.pop()
+            # The address of sub image is cached only if the address of its parent is
+            if image._cached_address is not None:  # pylint: disable=protected-access
+                image._cached_address = None  # pylint: disable=protected-access
+                images.extend(image.sub_images)
+
+    def __lt__(self, other: "BinaryImage") -> bool:
+        """Order images by their offset in parent image.
+
+        :param other: Image to compare with.
+        :return: True if this image starts before the other one.
+        """
+        return self.offset < other.offset
 
     @property
     def image_name(self) -> str:
@@ -217,26 +346,40 @@ class BinaryImage:
 
         :return: Absolute address relative to base parent
         """
-        if self.parent:
-            return self.parent.absolute_address + self.offset
-        return self.offset
+        if self._cached_address is None:
+            self._cached_address = self.offset
+            if self.parent is not None:
+                self._cached_address += self.parent.absolute_address
+        return self._cached_address
 
     def aligned_start(self, alignment: int = 4) -> int:
         """Returns aligned start address.
 
         :param alignment: The alignment value, defaults to 4.
         :returns: Floor alignment address.
+        :raises SPSDKValueError: The alignment is not positive.
         """
-        return math.floor(self.absolute_address / alignment) * alignment
+        if alignment <= 0:
+            raise SPSDKValueError(f"Invalid alignment: {alignment}")
+        address = self.absolute_address
+        if alignment & (alignment - 1) == 0:
+            return address & ~(alignment - 1)
+        return address - address % alignment
 
     def aligned_length(self, alignment: int = 4) -> int:
         """Returns aligned length for erasing purposes.
 
         :param alignment: The alignment value, defaults to 4.
         :returns: Ceil alignment length.
+        :raises SPSDKValueError: The alignment is not positive.
         """
+        if alignment <= 0:
+            raise SPSDKValueError(f"Invalid alignment: {alignment}")
         end_address = self.absolute_address + len(self)
-        aligned_end = math.ceil(end_address / alignment) * alignment
+        if alignment & (alignment - 1) == 0:
+            aligned_end = (end_address + alignment - 1) & ~(alignment - 1)
+        else:
+            aligned_end = -(-end_address // alignment) * alignment
         aligned_len = aligned_end - self.aligned_start(alignment)
         return aligned_len
 
@@ -246,16 +389,16 @@ class BinaryImage:
         :return: String information about Image.
         """
         size = len(self)
-        ret = ""
-        ret += f"Name:   {self.image_name}\n"
-        ret += f"Starts: {hex(self.absolute_address)}\n"
-        ret += f"Ends:   {hex(self.absolute_address+ size-1)}\n"
-        ret += f"Size:   {size_fmt(size, use_kibibyte=False)}\n"
-        if self.pattern:
-            ret += f"Pattern:{self.pattern.pattern}\n"
-        if self.description:
-            ret += self.description + "\n"
-        return ret
+        address = self.absolute_address
+        pattern = f"Pattern:{self.pattern.pattern}\n" if self.pattern else ""
+        description = f"{self.description}\n" if self.description else ""
+        return (
+            f"Name:   {self.image_name}\n"
+            f"Starts: {hex(address)}\n"
+            f"Ends:   {hex(address + size - 1)}\n"
+            f"Size:   {size_fmt(size, use_kibibyte=False)}\n"
+            f"{pattern}{description}"
+        )
 
     def validate(self) -> None:
         """Validate if the images doesn't overlaps each other."""
@@ -263,33 +406,45 @@ class BinaryImage:
             raise SPSDKValueError(
                 f"Image offset of {self.image_name} cannot be in negative numbers."
             )
-        if len(self) <= 0:
+        size = len(self)
+        if size <= 0:
             raise SPSDKValueError(
                 f"Image size of {self.image_name} cannot be in negative numbers or zero."
             )
+        previous: Optional[BinaryImage] = None
+        # Sub images are sorted by offset, so it's enough to check just the preceding one
         for image in self.sub_images:
             image.validate()
-            begin = image.offset
-            end = begin + len(image) - 1
+            end = image.offset + len(image)
             # Check if it fits inside the parent image
-            if end > len(self):
+            if end > size:
                 raise SPSDKOverlapError(
                     f"The image {image.name} doesn't fit into {self.name} parent image."
                 )
-            # Check if it doesn't overlap any other sibling image
-            for sibling in self.sub_images:
-                if sibling != image:
-                    sibling_begin = sibling.offset
-                    sibling_end = sibling_begin + len(sibling) - 1
-                    if end < sibling_begin or begin > sibling_end:
-                        continue
-
-                    raise SPSDKOverlapError(
-                        f"The image overlap error:\n"
-                        f"{image.info()}\n"
-                        "overlaps the:\n"
-                        f"{sibling.info()}\n"
-                    )
+            # Check if it doesn't overlap the previous sibling image
+            if previous is not None and image.offset < previous.offset + len(previous):
+                raise SPSDKOverlapError(
+                    f"The image overlap error:\n"
+                    f"{image.info()}\n"
+                    "overlaps the:\n"
+                    f"{previous.info()}\n"
+                )
+            previous = image
+
+    def _wrapped_description(self, width: int) -> List[str]:
+        """Get description wrapped into lines of given width.
+
+        :param width: Maximal width of line.
+        :return: List of description lines.
+        """
+        if not self.description:
+            return []
+        key = (self.description, width)
+        if key not in self._wrap_cache:
+            self._wrap_cache[key] = textwrap.wrap(
+                self.description, width=width, fix_sentence_endings=True
+            )
+        return self._wrap_cache[key]
 
     def get_min_draw_width(self, include_sub_images: bool = True) -> int:
         """Get minimal width of table for draw function.
@@ -332,20 +487,22 @@ class BinaryImage:
         # ||       Description12 2nd line     ||
         # |+--0x0000_041F---------------------+|
         # +--0x0000_07FF-----------------------+
+        # import colorama only if needed to save startup time
+        import colorama  # pylint: disable=import-outside-toplevel
+
+        white = colorama.Fore.WHITE
+
         def _get_centered_line(text: str) -> str:
             text_len = len(text)
             spaces = width - text_len - 2
             assert spaces >= 0, "Binary Image Draw: Center line is longer than width"
             padding_l = int(spaces / 2)
             padding_r = int(spaces - padding_l)
-            return color + f"|{' '*padding_l}{text}{' '*padding_r}|" + colorama.Fore.WHITE + "\n"
+            return color + f"|{' '*padding_l}{text}{' '*padding_r}|" + white + "\n"
 
         def wrap_block(inner: str) -> str:
-            wrapped_block = ""
             lines = inner.splitlines(keepends=False)
-            for line in lines:
-                wrapped_block += color + "|" + line + color + "|" + colorama.Fore.WHITE + "\n"
-            return wrapped_block
+            return "".join(color + "|" + line + color + "|" + white + "\n" for line in lines)
 
         color_picker = ColorPicker()
         try:
@@ -354,7 +511,7 @@ class BinaryImage:
         except SPSDKError:
             color = colorama.Fore.RED
 
-        block = "" if self.parent else "\n"
+        block: List[str] = [] if self.parent else ["\n"]
         min_width = self.get_min_draw_width(include_sub_images)
         if not width and self.parent is None:
             width = min_width
@@ -366,24 +523,23 @@ class BinaryImage:
 
         # - Title line
         header = f"+--{format_value(self.offset, 32)}--{self.name}--"
-        block += color + f"{header}{'-'*(width-len(header)-1)}+" + colorama.Fore.WHITE + "\n"
+        block.append(color + f"{header}{'-'*(width-len(header)-1)}+" + white + "\n")
         # - Size
-        block += _get_centered_line(f"Size: {size_fmt(len(self), False)}")
+        block.append(_get_centered_line(f"Size: {size_fmt(len(self), False)}"))
         # - Description
-        if self.description:
-            for line in textwrap.wrap(self.description, width=width - 2, fix_sentence_endings=True):
-                block += _get_centered_line(line)
+        for line in self._wrapped_description(width - 2):
+            block.append(_get_centered_line(line))
         # - Pattern
         if self.pattern:
-            block += _get_centered_line(f"Pattern: {self.pattern.pattern}")
+            block.append(_get_centered_line(f"Pattern: {self.pattern.pattern}"))
         # - Inner blocks
         if include_sub_images:
             next_free_space = 0
             for child in self.sub_images:
                 # If the images doesn't comes one by one place empty line
                 if child.offset != next_free_space:
-                    block += _get_centered_line(
-                        f"Gap: {size_fmt(child.offset-next_free_space, False)}"
+                    block.append(
+                        _get_centered_line(f"Gap: {size_fmt(child.offset-next_free_space, False)}")
                     )
                 next_free_space = child.offset + len(child)
                 inner_block = child.draw(
@@ -391,25 +547,27 @@ class BinaryImage:
                     width=width - 2,
                     color=color_picker.get_color(color),
                 )
-                block += wrap_block(inner_block)
+                block.append(wrap_block(inner_block))
 
         # - Closing line
         footer = f"+--{format_value(self.offset + len(self) - 1, 32)}--"
-        block += color + f"{footer}{'-'*(width-len(footer)-1)}+" + colorama.Fore.WHITE + "\n"
+        block.append(color + f"{footer}{'-'*(width-len(footer)-1)}+" + white + "\n")
 
         if self.parent is None:
-            block += "\n" + colorama.Fore.RESET
-        return block
+            block.append("\n" + colorama.Fore.RESET)
+        return "".join(block)
 
     def update_offsets(self) -> None:
         """Update offsets from the sub images into main offset value begin offsets."""
-        offsets = []
-        for image in self.sub_images:
-            offsets.append(image.offset)
-
-        min_offset = min(offsets)
+        if not self.sub_images:
+            return
+        # Sub images are sorted by offset, so the first one has the lowest
+        min_offset = self.sub_images[0].offset
+        # The uniform shift keeps the order of sub images and their absolute addresses,
+        # so bypass the offset setter which could reorder the list while iterating over it
         for image in self.sub_images:
-            image.offset -= min_offset
+            image._offset -= min_offset  # pylint: disable=protected-access
+        self._invalidate_len()
         self.offset += min_offset
 
     def __len__(self) -> int:
@@ -420,23 +578,41 @@ class BinaryImage:
         """
         if self._size:
             return self._size
-        max_size = len(self.binary) if self.binary else 0
-        for image in self.sub_images:
-            size = image.offset + len(image)
-            max_size = max(size, max_size)
-        return max_size
+        if self._cached_len is None:
+            max_size = len(self.binary) if self.binary else 0
+            for image in self.sub_images:
+                size = image.offset + len(image)
+                max_size = max(size, max_size)
+            self._cached_len = max_size
+        return self._cached_len
 
     def export(self) -> bytes:
         """Export represented binary image.
 
         :return: Byte array of binary image.
         """
-        ret = bytearray(self.pattern.get_block(len(self))) if self.pattern else bytearray(len(self))
+        ret = bytearray(len(self))
+        self._export_into(memoryview(ret), zeroed=True)
+        return ret
+
+    def _export_into(self, buffer: memoryview, zeroed: bool = False) -> None:
+        """Export represented binary image directly into the buffer.
+
+        :param buffer: Writable buffer of image size, the image content is written into.
+        :param zeroed: The buffer is already filled with zeros, defaults to False
+        """
+        if not self.pattern or self.pattern.is_zero:
+            if not zeroed:
+                _fill_with_pattern(buffer, b"\x00")
+        else:
+            self.pattern.fill_into(buffer)
         if self.binary:
-            ret[: len(self.binary)] = self.binary
+            size = min(len(self.binary), len(buffer))
+            buffer[:size] = memoryview(self.binary)[:size]
         for image in self.sub_images:
-            ret[image.offset : image.offset + len(image)] = image.export()[: len(image)]
-        return ret
+            image._export_into(  # pylint: disable=protected-access
+                buffer[image.offset : image.offset + len(image)]
+            )
 
     @staticmethod
     def get_validation_schemas() -> List[Dict[str, Any]]:
@@ -493,16 +669,51 @@ class BinaryImage:
             raise SPSDKValueError(f"Invalid input file format: {file_format}")
 
         if file_format == "BIN":
-            write_file(self.export(), path, mode="wb")
+            size = len(self)
+            if not size:
+                write_file(b"", path, mode="wb")
+                return
+            # Export the image into a temporary file next to the target (create missing folders
+            # like write_file does) and replace the target only once the export succeeded
+            path = path.replace("\\", "/")
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+            try:
+                with open(tmp_path, "x+b") as f:
+                    f.truncate(size)
+                    with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE) as mapped_file:
+                        with memoryview(mapped_file) as buffer:
+                            try:
+                                self._export_into(buffer, zeroed=True)
+                            except Exception as exc:
+                                # Release the buffer slices held by the failed frames,
+                                # otherwise the mapped file can't be closed
+                                if exc.__traceback__:
+                                    traceback.clear_frames(exc.__traceback__)
+                                raise
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
             return
 
+        # The same pattern blocks are shared among images, except the random ones
+        pattern_blocks: Dict[Tuple[bytes, int], bytes] = {}
+
         def add_into_binary(bin_image: BinaryImage) -> None:
             if bin_image.pattern:
-                bin_file.add_binary(
-                    bin_image.pattern.get_block(len(bin_image)),
-                    address=bin_image.absolute_address,
-                    overwrite=True,
-                )
+                size = len(bin_image)
+                # Key on the fill bytes, different patterns may share the same hex notation
+                fill = bin_image.pattern._fill  # pylint: disable=protected-access
+                block = pattern_blocks.get((fill, size)) if fill is not None else None
+                if block is None:
+                    block = bin_image.pattern.get_block(size)
+                    if fill is not None:
+                        pattern_blocks[(fill, size)] = block
+                bin_file.add_binary(block, address=bin_image.absolute_address, overwrite=True)
 
             if bin_image.binary:
                 bin_file.add_binary(
@@ -562,7 +773,7 @@ class BinaryImage:
         path = find_file(path, search_paths=search_paths)
         try:
             with open(path, "rb") as f:
-                data = f.read(4)
+                data = f.read()
         except Exception as e:
             raise SPSDKError(f"Error loading file: {str(e)}") from e
 
@@ -571,14 +782,14 @@ class BinaryImage:
 
         bin_file = bincopy.BinFile()
         try:
-            if data == b"\x7fELF":
+            if data[:4] == ELF_MAGIC:
                 logger.warning("Elf file support is experimental. Take that with care.")
-                bin_file.add_elf_file(path)
+                bin_file.add_elf(data)
             else:
                 try:
-                    bin_file.add_file(path)
+                    bin_file.add(data.decode())
                 except (UnicodeDecodeError, bincopy.UnsupportedFileFormatError):
-                    bin_file.add_binary_file(path)
+                    bin_file.add_binary(data)
         except Exception as e:
             raise SPSDKError(f"Error loading file: {str(e)}") from e
 
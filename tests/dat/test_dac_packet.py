@@ -32,3 +32,13 @@ def test_dac_packet_export_parse_Lpc55s3x(data_dir):
     dac = DebugAuthenticationChallenge.parse(value, offset=0)
     exported_dac = dac.export()
     assert exported_dac == value, "Export and parse of DAC packet do not work"
+
+
+def test_dac_packet_version_change(data_dir):
+    value = load_binary(os.path.join(data_dir, "sample_dac.bin"))
+    dac = DebugAuthenticationChallenge.parse(value, offset=0)
+    dac.version = "2.0"
+    assert dac.version == "2.0"
+    exported_dac = dac.export()
+    assert exported_dac[:4] == b"\x02\x00\x00\x00"
+    assert exported_dac[4:] == value[4:]
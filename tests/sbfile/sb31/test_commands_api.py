@@ -501,3 +501,13 @@ def test_invalid_base_load_cmd():
         cmd._extract_data(
             data=b"U\xaa\xaaU\x00\x00\x01\x00\x00\x00\x01\x00\x00\x00\x01\x00\x00\x00\x01\x00\x00\x00\x01\x00\x00\x00\x01\x00\x00\x01\x00\x00"
         )
+
+
+def test_cmd_tag_resolve():
+    """Test constant time lookups of command tags match the enumeration."""
+    for name, value, _ in EnumCmdTag:
+        assert EnumCmdTag.resolve_name(value) == EnumCmdTag.name(value) == name
+        assert EnumCmdTag.resolve_value(name) == EnumCmdTag[name] == value
+    assert EnumCmdTag.resolve_name(0xFF) is None
+    assert EnumCmdTag.resolve_value("UNKNOWN") is None
+    assert len(EnumCmdTag) == 14
@@ -5,6 +5,11 @@
 #
 # SPDX-License-Identifier: BSD-3-Clause
 
+import os
+
+import pytest
+
+from spsdk.exceptions import SPSDKError, SPSDKOverlapError, SPSDKValueError
 from spsdk.utils.images import BinaryImage, BinaryPattern
 
 
@@ -23,3 +28,288 @@ def test_binary_image_sort_sub_images():
     image.validate()
 
     assert image.export() == b"\x00\x00\x02\x00\x04\x00\x06\x00"
+
+
+def test_binary_pattern_inc():
+    """Incrementing pattern wraps around after 0xFF"""
+    assert BinaryPattern("inc").get_block(0) == b""
+    assert BinaryPattern("inc").get_block(3) == b"\x00\x01\x02"
+    block = BinaryPattern("inc").get_block(0x201)
+    assert block == bytes(x & 0xFF for x in range(0x201))
+
+
+def test_binary_pattern_custom():
+    """Custom pattern is repeated to the exact requested size"""
+    assert BinaryPattern("ones").get_block(3) == b"\xff\xff\xff"
+    assert BinaryPattern("0x1234").get_block(4) == b"\x12\x34\x12\x34"
+    assert BinaryPattern("0x1234").get_block(5) == b"\x12\x34\x12\x34\x12"
+    assert BinaryPattern("0x1234").get_block(1) == b"\x12"
+
+
+def test_binary_image_export_nested():
+    """Nested images are exported over the parent pattern"""
+    image = BinaryImage(name="main", size=8, pattern=BinaryPattern("ones"))
+    inner = BinaryImage(name="inner", offset=2, size=4, pattern=BinaryPattern("0x11"))
+    inner.add_image(BinaryImage(name="leaf", offset=1, size=2, binary=b"\xab\xcd"))
+    image.add_image(inner)
+    image.add_image(BinaryImage(name="zeros", offset=6, size=1))
+
+    image.validate()
+
+    assert image.export() == b"\xff\xff\x11\xab\xcd\x11\x00\xff"
+
+
+def test_binary_image_validate_overlap():
+    """Overlapping sibling images and images out of parent are detected"""
+    image = BinaryImage(name="main", size=8)
+    image.add_image(BinaryImage(name="first", offset=0, size=4))
+    image.add_image(BinaryImage(name="second", offset=4, size=4))
+    image.validate()
+
+    image.add_image(BinaryImage(name="overlap", offset=3, size=1))
+    with pytest.raises(SPSDKOverlapError):
+        image.validate()
+
+    image = BinaryImage(name="main", size=8)
+    image.add_image(BinaryImage(name="outside", offset=6, size=3))
+    with pytest.raises(SPSDKOverlapError):
+        image.validate()
+
+
+def test_binary_image_len_update():
+    """Computed image size follows changes of sub images"""
+    image = BinaryImage(name="main")
+    inner = BinaryImage(name="inner", offset=2)
+    image.add_image(inner)
+    assert len(image) == 2
+
+    inner.binary = b"\x00" * 4
+    assert len(image) == 6
+
+    inner.add_image(BinaryImage(name="leaf", offset=6, size=2))
+    assert len(inner) == 8
+    assert len(image) == 10
+
+    inner.offset = 0
+    assert len(image) == 8
+
+
+def test_binary_image_alignment():
+    """Aligned start and length for power of two and other alignments"""
+    image = BinaryImage(name="main", size=0x20)
+    inner = BinaryImage(name="inner", offset=0x13, size=0x6)
+    image.add_image(inner)
+
+    assert inner.aligned_start() == 0x10
+    assert inner.aligned_length() == 0xC
+    assert inner.aligned_start(0x10) == 0x10
+    assert inner.aligned_length(0x10) == 0x10
+    assert inner.aligned_start(3) == 0x12
+    assert inner.aligned_length(3) == 0x9
+    assert inner.aligned_start(1) == 0x13
+    assert inner.aligned_length(1) == 0x6
+
+
+@pytest.mark.parametrize("alignment", [0, -4])
+def test_binary_image_invalid_alignment(alignment):
+    """Non positive alignment is refused"""
+    image = BinaryImage(name="main", offset=0x13, size=0x6)
+    with pytest.raises(SPSDKValueError):
+        image.aligned_start(alignment)
+    with pytest.raises(SPSDKValueError):
+        image.aligned_length(alignment)
+
+
+def test_binary_pattern_is_zero():
+    """Zero patterns are recognized also in numeric form"""
+    assert BinaryPattern("zeros").is_zero
+    assert BinaryPattern("0x00").is_zero
+    assert BinaryPattern("0").is_zero
+    assert not BinaryPattern("ones").is_zero
+    assert not BinaryPattern("inc").is_zero
+    assert not BinaryPattern("0x0100").is_zero
+
+
+def test_binary_image_absolute_address_update():
+    """Absolute address of nested images follows offset changes"""
+    image = BinaryImage(name="main", offset=0x1000)
+    inner = BinaryImage(name="inner", offset=0x100)
+    leaf = BinaryImage(name="leaf", offset=0x10, size=1)
+    inner.add_image(leaf)
+    assert leaf.absolute_address == 0x110
+
+    image.add_image(inner)
+    assert leaf.absolute_address == 0x1110
+
+    image.offset = 0x2000
+    assert inner.absolute_address == 0x2100
+    assert leaf.absolute_address == 0x2110
+
+    inner.update_offsets()
+    assert inner.offset == 0x110
+    assert leaf.offset == 0
+    assert leaf.absolute_address == 0x2110
+
+
+def test_binary_image_offset_change_keeps_order():
+    """Sub images stay sorted when offset is changed after adding"""
+    image = BinaryImage(name="main", size=0x40)
+    image_a = BinaryImage(name="a", offset=0, size=4)
+    image_b = BinaryImage(name="b", offset=8, size=4)
+    image.add_image(image_a)
+    image.add_image(image_b)
+
+    image_a.offset = 0x20
+    assert image.sub_images == [image_b, image_a]
+    image.validate()
+
+    image_a.offset = 0
+    assert image.sub_images == [image_a, image_b]
+    image.validate()
+
+
+def test_binary_image_update_offsets_after_offset_change():
+    """Minimal offset is found also after the sub image offset changes"""
+    image = BinaryImage(name="main")
+    image_a = BinaryImage(name="a", offset=0x10, size=4)
+    image_b = BinaryImage(name="b", offset=0x20, size=4)
+    image.add_image(image_a)
+    image.add_image(image_b)
+
+    image_a.offset = 0x30
+    image.update_offsets()
+
+    assert image.offset == 0x20
+    assert image_a.offset == 0x10
+    assert image_b.offset == 0
+    image.validate()
+
+
+def _nested_image() -> BinaryImage:
+    image = BinaryImage(name="main", size=0x100, offset=0x1000, pattern=BinaryPattern("ones"))
+    inner = BinaryImage(name="inner", offset=0x10, size=0x40, pattern=BinaryPattern("0x1234"))
+    inner.add_image(BinaryImage(name="inc", offset=0x8, size=0x10, pattern=BinaryPattern("inc")))
+    inner.add_image(BinaryImage(name="bin", offset=0x20, size=0x4, binary=b"\xab\xcd\xef\x01"))
+    image.add_image(inner)
+    image.add_image(
+        BinaryImage(name="zeros", offset=0x80, size=0x20, pattern=BinaryPattern("zeros"))
+    )
+    image.add_image(
+        BinaryImage(name="same", offset=0xC0, size=0x40, pattern=BinaryPattern("0x1234"))
+    )
+    return image
+
+
+@pytest.mark.parametrize("file_format", ["BIN", "HEX", "S19"])
+def test_binary_image_save(tmpdir, file_format):
+    """Saved image has the same content as the exported one"""
+    image = _nested_image()
+    path = os.path.join(tmpdir, "sub", f"image.{file_format.lower()}")
+    image.save_binary_image(path, file_format)
+
+    loaded = BinaryImage.load_binary_image(path)
+    if file_format != "BIN":
+        assert loaded.offset == 0x1000
+    assert loaded.export() == image.export()
+
+
+@pytest.mark.parametrize("file_format", ["BIN", "HEX"])
+def test_binary_image_save_empty(tmpdir, file_format):
+    """Image of zero size is saved as empty file"""
+    path = os.path.join(tmpdir, f"empty.{file_format.lower()}")
+    BinaryImage(name="empty").save_binary_image(path, file_format)
+    assert os.path.isfile(path)
+    if file_format == "BIN":
+        assert os.path.getsize(path) == 0
+
+
+@pytest.mark.parametrize("file_format", ["BIN", "HEX"])
+def test_binary_image_save_rand(tmpdir, file_format):
+    """Random pattern blocks are not shared among images"""
+    image = BinaryImage(name="main", pattern=BinaryPattern("rand"))
+    image.add_image(BinaryImage(name="first", size=0x40, pattern=BinaryPattern("rand")))
+    image.add_image(BinaryImage(name="fixed", offset=0x40, size=0x4, binary=b"\x01\x02\x03\x04"))
+    image.add_image(
+        BinaryImage(name="second", offset=0x44, size=0x40, pattern=BinaryPattern("rand"))
+    )
+    path = os.path.join(tmpdir, f"rand.{file_format.lower()}")
+    image.save_binary_image(path, file_format)
+
+    data = BinaryImage.load_binary_image(path).export()
+    assert len(data) == len(image)
+    assert data[0x40:0x44] == b"\x01\x02\x03\x04"
+    assert data[:0x40] != data[0x44:]
+
+
+def test_binary_image_save_failed(tmpdir, monkeypatch):
+    """No file is left behind when export of binary fails"""
+
+    def _fail(*args, **kwargs):
+        raise SPSDKError("Export failed")
+
+    image = _nested_image()
+    monkeypatch.setattr(image, "_export_into", _fail)
+    path = os.path.join(tmpdir, "failed.bin")
+    with pytest.raises(SPSDKError):
+        image.save_binary_image(path)
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("file_format", ["HEX", "S19"])
+def test_binary_image_save_same_notation(tmpdir, file_format):
+    """Patterns with the same hex notation but different bytes don't share blocks"""
+    assert BinaryPattern(b"\x00\x01").pattern == BinaryPattern(b"\x01").pattern
+    image = BinaryImage(name="main", pattern=BinaryPattern("zeros"))
+    image.add_image(BinaryImage(name="first", size=0x10, pattern=BinaryPattern(b"\x00\x01")))
+    image.add_image(
+        BinaryImage(name="second", offset=0x10, size=0x10, pattern=BinaryPattern(b"\x01"))
+    )
+    path = os.path.join(tmpdir, f"notation.{file_format.lower()}")
+    image.save_binary_image(path, file_format)
+
+    data = BinaryImage.load_binary_image(path).export()
+    assert data == image.export()
+    assert data == b"\x00\x01" * 8 + b"\x01" * 0x10
+
+
+@pytest.mark.parametrize("existing", [False, True])
+def test_binary_image_save_nested_failed(tmpdir, monkeypatch, existing):
+    """Failure of nested export is propagated and existing file is kept untouched"""
+
+    def _fail(*args, **kwargs):
+        raise SPSDKError("Fill failed")
+
+    image = _nested_image()
+    leaf = image.sub_images[0].sub_images[0]
+    assert leaf.name == "inc"
+    monkeypatch.setattr(leaf.pattern, "fill_into", _fail)
+    path = os.path.join(tmpdir, "failed.bin")
+    if existing:
+        with open(path, "wb") as f:
+            f.write(b"original")
+    with pytest.raises(SPSDKError, match="Fill failed"):
+        image.save_binary_image(path)
+    if existing:
+        with open(path, "rb") as f:
+            assert f.read() == b"original"
+    else:
+        assert not os.path.exists(path)
+    assert os.listdir(tmpdir) == (["failed.bin"] if existing else [])
+
+
+def test_binary_image_update_offsets_negative():
+    """Sub images with negative offsets are shifted to start at zero"""
+    image = BinaryImage(name="main", offset=0x100)
+    image_a = BinaryImage(name="a", offset=-0x10, size=4)
+    image_b = BinaryImage(name="b", offset=-0x8, size=4)
+    image.add_image(image_a)
+    image.add_image(image_b)
+
+    image.update_offsets()
+
+    assert [sub_image.offset for sub_image in image.sub_images] == [0, 8]
+    assert image.offset == 0xF0
+    assert image_a.absolute_address == 0xF0
+    assert image_b.absolute_address == 0xF8
+    assert len(image) == 0xC
+    image.validate()